@@ -0,0 +1,206 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
+import numpy as np
+
+PASSING_THRESHOLD = 60
+
+URGENT_FOCUS = "URGENT FOCUS: '{competency}' has a very low pass rate of {pass_rate:.2f}%. A comprehensive re-teaching of this topic is strongly recommended for the entire class."
+HIGH_PRIORITY = "HIGH PRIORITY: '{competency}' shows a significant struggle with a {pass_rate:.2f}% pass rate. Consider a targeted review session and providing supplementary materials."
+REVIEW_SUGGESTED = "REVIEW SUGGESTED: While the pass rate for '{competency}' is {pass_rate:.2f}%, a number of students still require support. A quick review or a peer-tutoring session could be beneficial."
+
+
+@dataclass(frozen=True)
+class Analysis:
+    """
+    Result of analyzing a grades file against its codebook.
+
+    Attributes:
+        failed_df (pd.DataFrame): One row per failing score, in student order,
+            with the columns "row", "Name", "Assessment ID", "Score",
+            "Content Domain" and "Learning Competency". Scores are unrounded
+            and "Assessment ID" is categorical over the assessment columns.
+        failing_students (list): Per-student failing assessments, as exported
+            to the dashboard JSON (scores rounded to 2 decimals).
+        competency_performance (dict): Pass rate (%) per learning competency,
+            rounded to 2 decimals, in codebook order.
+        class_recommendations (list): Recommendations for the 3 competencies
+            with the lowest pass rates.
+    """
+    failed_df: pd.DataFrame
+    failing_students: list
+    competency_performance: dict
+    class_recommendations: list
+
+
+def file_mtime(path):
+    """
+    Returns the modification time of a file, or None if it cannot be read.
+    """
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def format_recommendations(pass_rates):
+    """
+    Builds a class recommendation for each competency, picking the wording
+    from how low its pass rate is.
+
+    Args:
+        pass_rates (pd.Series): Pass rate (%) indexed by learning competency.
+    """
+    templates = np.select(
+        [pass_rates < 50, pass_rates < 75],
+        [URGENT_FOCUS, HIGH_PRIORITY],
+        default=REVIEW_SUGGESTED
+    )
+    return [
+        template.format(competency=competency, pass_rate=pass_rate)
+        for template, competency, pass_rate in zip(templates, pass_rates.index, pass_rates)
+    ]
+
+
+def load_analysis(grades_file, codebook_file, engine="c"):
+    """
+    Analyzes the grades and codebook files, reusing the previous result for as
+    long as neither file changes.
+
+    Args:
+        grades_file (str): Path to the grades CSV file.
+        codebook_file (str): Path to the codebook CSV file.
+        engine (str): pandas CSV engine used to parse the grades file.
+
+    Raises:
+        FileNotFoundError: If either file does not exist.
+    """
+    return compute_analysis(grades_file, codebook_file, file_mtime(grades_file), file_mtime(codebook_file), engine)
+
+
+@lru_cache(maxsize=4)
+def compute_analysis(grades_file, codebook_file, grades_mtime=None, codebook_mtime=None, engine="c"):
+    """
+    Finds failing scores, per-competency pass rates and class recommendations.
+
+    The modification times only serve as part of the cache key, so that an
+    edited file is analyzed again. The returned Analysis is shared between
+    callers and must not be modified.
+
+    Args:
+        grades_file (str): Path to the grades CSV file.
+        codebook_file (str): Path to the codebook CSV file.
+        grades_mtime (float): Modification time of the grades file.
+        codebook_mtime (float): Modification time of the codebook file.
+        engine (str): pandas CSV engine used to parse the grades file.
+
+    Raises:
+        FileNotFoundError: If either file does not exist.
+    """
+    # Only the columns the analysis uses are parsed from the codebook.
+    codebook_df = pd.read_csv(codebook_file, usecols=["Assessment ID", "Content Domain", "Learning Competency"])
+    # Parse only the name and score columns, with spreadsheet error values
+    # read as missing. The pyarrow engine needs usecols as a list, so it is
+    # taken from the header.
+    codebook_ids = pd.Index(codebook_df["Assessment ID"].unique())
+    grades_header = pd.read_csv(grades_file, nrows=0).columns
+    grades_df = pd.read_csv(
+        grades_file,
+        engine=engine,
+        usecols=[column for column in grades_header if column == "Name" or column in codebook_ids],
+        na_values=["#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#NULL!"]
+    )
+
+    # --- Data Cleaning and Preparation ---
+    # Drop columns named '0' if they exist
+    grades_df = grades_df.drop(columns=['0'], errors="ignore")
+
+    # Assessment columns in the order they appear in the grades file
+    assessment_columns = grades_df.columns.intersection(codebook_ids).tolist()
+
+    # Codebook details keyed by Assessment ID, built once and shared by every
+    # lookup below instead of re-filtering the codebook per assessment.
+    assessment_info = codebook_df.drop_duplicates("Assessment ID").set_index("Assessment ID")[["Content Domain", "Learning Competency"]]
+
+    # All analyses below work on one dense, row-major float64 matrix of
+    # scores (students x assessments); the DataFrame only supplies names.
+    # float64 keeps spreadsheet values like 59.999999 below the threshold.
+    # Any other text in a score cell (e.g. "absent", "INC") is coerced to
+    # missing, and missing scores, including '#DIV/0!' and other spreadsheet
+    # errors, count as a score of 0.
+    score_df = grades_df[assessment_columns].apply(pd.to_numeric, errors="coerce")
+    scores = np.ascontiguousarray(score_df.to_numpy(dtype=np.float64, na_value=0))
+    student_names = grades_df["Name"].to_numpy()
+
+    # Scan the score matrix for failing entries in one vectorized compare.
+    # np.nonzero walks it row-major, so the hits come out grouped by student
+    # and in assessment order. The column indices double as categorical codes
+    # for Assessment ID and as positions into the per-column codebook details,
+    # so labelling the hits needs no string hashing or join.
+    failed_rows, failed_cols = np.nonzero(scores < PASSING_THRESHOLD)
+    column_info = assessment_info.reindex(assessment_columns)
+    failed_df = pd.DataFrame({
+        "row": failed_rows,
+        "Name": student_names[failed_rows],
+        "Assessment ID": pd.Categorical.from_codes(failed_cols, dtype=pd.CategoricalDtype(assessment_columns)),
+        "Score": scores[failed_rows, failed_cols],
+        "Content Domain": column_info["Content Domain"].to_numpy()[failed_cols],
+        "Learning Competency": column_info["Learning Competency"].to_numpy()[failed_cols]
+    })
+
+    # Convert every failing score to a record in one pass, then split the
+    # records into per-student lists where the (sorted) student row changes.
+    failed_records = (
+        failed_df[["Assessment ID", "Score", "Content Domain", "Learning Competency"]]
+        .round({"Score": 2})
+        .rename(columns={
+            "Assessment ID": "assessment_id",
+            "Score": "score",
+            "Content Domain": "content_domain",
+            "Learning Competency": "learning_competency"
+        })
+        .to_dict("records")
+    )
+    failing_student_rows, record_starts = np.unique(failed_rows, return_index=True)
+    record_ends = np.append(record_starts[1:], len(failed_records))
+    failing_students = [
+        {
+            "student_name": student_names[row],
+            "failed_assessments": failed_records[start:end]
+        }
+        for row, start, end in zip(failing_student_rows, record_starts, record_ends)
+    ]
+
+    # --- Dynamic Recommendations Analysis ---
+    # Pass rate of every assessment column of the score matrix, averaged per
+    # competency. Every column covers the same students, so the mean of the
+    # column rates is the competency's overall pass rate. A file without
+    # student rows has no pass rates, so every competency is skipped.
+    if len(scores):
+        column_pass_rates = (scores >= PASSING_THRESHOLD).mean(axis=0) * 100
+    else:
+        column_pass_rates = np.full(len(assessment_columns), np.nan)
+    assessment_pass_rates = pd.Series(column_pass_rates, index=assessment_columns)
+    # Walk the assessments in codebook order; ones without a competency fall
+    # out of the groupby as NaN keys.
+    assessment_competencies = assessment_info.loc[assessment_info.index.isin(assessment_columns), "Learning Competency"]
+    competency_pass_rates = (
+        assessment_pass_rates[assessment_competencies.index]
+        .groupby(assessment_competencies, sort=False)
+        .mean()
+        .dropna()
+        .round(2)
+        .drop(index=[0, 'Unknown'], errors="ignore")
+    )
+
+    # Focus on the 3 most challenging competencies
+    class_recommendations = format_recommendations(competency_pass_rates.nsmallest(3))
+
+    return Analysis(
+        failed_df=failed_df,
+        failing_students=failing_students,
+        competency_performance=competency_pass_rates.to_dict(),
+        class_recommendations=class_recommendations
+    )
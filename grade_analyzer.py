@@ -1,5 +1,8 @@
-import pandas as pd
+from collections import defaultdict
 from datetime import datetime
+from pathlib import Path
+
+from analysis_core import load_analysis
 
 def analyze_grades(grades_file, codebook_file, output_dir):
     """
@@ -12,146 +15,77 @@ def analyze_grades(grades_file, codebook_file, output_dir):
         output_dir (str): Directory to save the output file.
     """
     try:
-        grades_df = pd.read_csv(grades_file)
-        codebook_df = pd.read_csv(codebook_file)
+        analysis = load_analysis(grades_file, codebook_file)
     except FileNotFoundError as e:
         print(f"Error: {e}. Please check the file paths.")
         return
 
-    # --- Data Cleaning and Preparation ---
-    # Replace '#DIV/0!' with 0, assuming it means a score of 0
-    grades_df.replace("#DIV/0!", 0, inplace=True)
-
-    # Drop columns named '0' if they exist
-    if '0' in grades_df.columns:
-        grades_df.drop(columns=['0'], inplace=True)
-
-    # Get assessment columns by finding the intersection of columns
-    # from both dataframes, excluding 'Name' and 'Gender' from grades_df
-    assessment_columns = list(set(grades_df.columns) & set(codebook_df['Assessment ID']))
-
-    # Convert assessment columns to numeric, coercing errors
-    for col in assessment_columns:
-        grades_df[col] = pd.to_numeric(grades_df[col], errors='coerce')
-
-    # Fill any remaining NaN values with 0
-    grades_df[assessment_columns] = grades_df[assessment_columns].fillna(0)
-
-
-    passing_threshold = 60
-    failing_students = {}
-
-    for index, student in grades_df.iterrows():
-        student_name = student["Name"]
-        failed_assessments = []
-
-        for assessment_id in assessment_columns:
-            score = student[assessment_id]
-            if score < passing_threshold:
-                assessment_info = codebook_df[codebook_df["Assessment ID"] == assessment_id]
-                if not assessment_info.empty:
-                    failed_assessments.append({
-                        "Assessment ID": assessment_id,
-                        "Score": score,
-                        "Content Domain": assessment_info.iloc[0]["Content Domain"],
-                        "Learning Competency": assessment_info.iloc[0]["Learning Competency"]
-                    })
-
-        if failed_assessments:
-            failing_students[student_name] = failed_assessments
-
-    remediation_groups = {}
-    for student, assessments in failing_students.items():
-        for assessment in assessments:
-            competency = assessment["Learning Competency"]
-            if competency not in remediation_groups:
-                remediation_groups[competency] = []
-            remediation_groups[competency].append(student)
-
-    # --- Dynamic Recommendations Analysis ---
-    competency_performance = {}
-    codebook_df['Learning Competency'] = codebook_df['Learning Competency'].fillna('Unknown')
-    unique_competencies = codebook_df["Learning Competency"].unique()
-
-    for competency in unique_competencies:
-        if competency in [0, 'Unknown'] or pd.isna(competency):
-            continue
-        
-        assessment_ids = codebook_df[codebook_df["Learning Competency"] == competency]["Assessment ID"].tolist()
-        
-        assessment_ids = [aid for aid in assessment_ids if aid in grades_df.columns]
-
-        if not assessment_ids:
-            continue
-
-        total_students = len(grades_df)
-        total_passed = grades_df[assessment_ids].apply(lambda x: (x >= passing_threshold)).sum().sum()
-        
-        total_possible = total_students * len(assessment_ids)
+    failed_df = analysis.failed_df
 
-        if total_possible > 0:
-            pass_rate = (total_passed / total_possible) * 100
-            competency_performance[competency] = pass_rate
+    remediation_groups = defaultdict(set)
+    for student, competency in failed_df[["Name", "Learning Competency"]].itertuples(index=False, name=None):
+        remediation_groups[competency].add(student)
 
-    sorted_competencies = sorted(competency_performance.items(), key=lambda item: item[1])
+    sorted_competencies = sorted(analysis.competency_performance.items(), key=lambda item: item[1])
 
 
     # --- Generate Report ---
     today_date = datetime.now().strftime("%Y-%m-%d")
     output_filename = f"remediation_plan_{today_date}.txt"
-    output_path = f"{output_dir}/{output_filename}"
-
-    with open(output_path, "w") as f:
-        f.write(f"Remediation Plan - {today_date}\n")
-        f.write("=" * 30 + "\n\n")
-
-        f.write("Individual Remediation Plans\n")
-        f.write("-" * 40 + "\n")
-        for student, assessments in failing_students.items():
-            f.write(f"\nStudent: {student}\n")
-            for assessment in assessments:
-                score_info = f"(Score: {assessment['Score']:.2f})"
-                if assessment['Score'] == 0:
-                    score_info += " - Note: Student may have missed this assessment."
-                f.write(f"  - Failed Assessment: {assessment['Assessment ID']} {score_info}\n")
-                f.write(f"    - Competency: {assessment['Learning Competency']}\n")
-                f.write(f"    - Recommended Program: Focus on {assessment['Learning Competency']}.\n")
-                f.write(f"    - Specific Task: Review concepts related to {assessment['Assessment ID']}.\n")
-                f.write(f"    - Suggestion: Provide one-on-one tutoring and additional practice exercises.\n")
-
-        f.write("\n" + "=" * 30 + "\n\n")
-
-
-        f.write("Remediation Groups based on Learning Competency\n")
-        f.write("-" * 40 + "\n")
-        for competency, students in remediation_groups.items():
-            f.write(f"\nLearning Competency: {competency}\n")
-            f.write("  Students needing support:\n")
-            for student in set(students):
-                f.write(f"    - {student}\n")
-        f.write("\n" + "=" * 30 + "\n\n")
-
-        f.write("Class Performance Analysis and Recommendations\n")
-        f.write("-" * 40 + "\n")
-        f.write("This section analyzes the overall class performance for each learning competency.\n\n")
-        
-        if not sorted_competencies:
-            f.write("No competency performance data to display.\n")
-        else:
-            f.write("Performance by Learning Competency (sorted by pass rate):\n")
-            for competency, pass_rate in sorted_competencies:
-                f.write(f"- {competency}: {pass_rate:.2f}% pass rate\n")
-
-            f.write("\nRecommendations:\n")
-            # Generate dynamic recommendations for the bottom 2-3 competencies
-            for i, (competency, pass_rate) in enumerate(sorted_competencies):
-                if i < 3: # Focus on the 3 most challenging competencies
-                    if pass_rate < 50:
-                        f.write(f"\n- URGENT FOCUS: '{competency}' has a very low pass rate of {pass_rate:.2f}%. A comprehensive re-teaching of this topic is strongly recommended for the entire class.\n")
-                    elif pass_rate < 75:
-                        f.write(f"\n- HIGH PRIORITY: '{competency}' shows a significant struggle with a {pass_rate:.2f}% pass rate. Consider a targeted review session and providing supplementary materials.\n")
-                    else:
-                        f.write(f"\n- REVIEW SUGGESTED: While the pass rate for '{competency}' is {pass_rate:.2f}%, a number of students still require support. A quick review or a peer-tutoring session could be beneficial.\n")
+    output_path = Path(output_dir) / output_filename
+
+    # The report is assembled in memory and written with a single call
+    report = []
+    report.append(f"Remediation Plan - {today_date}\n")
+    report.append("=" * 30 + "\n\n")
+
+    report.append("Individual Remediation Plans\n")
+    report.append("-" * 40 + "\n")
+    # failed_df is ordered by student, so a change of row starts the next one
+    current_row = None
+    failed_assessments = failed_df[["row", "Name", "Assessment ID", "Score", "Learning Competency"]]
+    for row, student, assessment_id, score, competency in failed_assessments.itertuples(index=False, name=None):
+        if row != current_row:
+            report.append(f"\nStudent: {student}\n")
+            current_row = row
+        score_info = f"(Score: {score:.2f})"
+        if score == 0:
+            score_info += " - Note: Student may have missed this assessment."
+        report.append(f"  - Failed Assessment: {assessment_id} {score_info}\n")
+        report.append(f"    - Competency: {competency}\n")
+        report.append(f"    - Recommended Program: Focus on {competency}.\n")
+        report.append(f"    - Specific Task: Review concepts related to {assessment_id}.\n")
+        report.append(f"    - Suggestion: Provide one-on-one tutoring and additional practice exercises.\n")
+
+    report.append("\n" + "=" * 30 + "\n\n")
+
+
+    report.append("Remediation Groups based on Learning Competency\n")
+    report.append("-" * 40 + "\n")
+    for competency, students in remediation_groups.items():
+        report.append(f"\nLearning Competency: {competency}\n")
+        report.append("  Students needing support:\n")
+        for student in students:
+            report.append(f"    - {student}\n")
+    report.append("\n" + "=" * 30 + "\n\n")
+
+    report.append("Class Performance Analysis and Recommendations\n")
+    report.append("-" * 40 + "\n")
+    report.append("This section analyzes the overall class performance for each learning competency.\n\n")
+    
+    if not sorted_competencies:
+        report.append("No competency performance data to display.\n")
+    else:
+        report.append("Performance by Learning Competency (sorted by pass rate):\n")
+        for competency, pass_rate in sorted_competencies:
+            report.append(f"- {competency}: {pass_rate:.2f}% pass rate\n")
+
+        report.append("\nRecommendations:\n")
+        # Dynamic recommendations for the bottom 2-3 competencies
+        for recommendation in analysis.class_recommendations:
+            report.append(f"\n- {recommendation}\n")
+
+    output_path.write_text("".join(report))
 
     print(f"Remediation plan saved to {output_path}")
 
@@ -2,88 +2,31 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 
+from analysis_core import load_analysis
+
 def analyze_grades_streamlit(grades_file, codebook_file):
     try:
-        grades_df = pd.read_csv(grades_file)
-        codebook_df = pd.read_csv(codebook_file)
+        # pyarrow ships with Streamlit, so its multithreaded CSV parser is
+        # always available here. The analysis is cached until a file changes.
+        analysis = load_analysis(grades_file, codebook_file, engine="pyarrow")
     except FileNotFoundError as e:
         st.error(f"Error: {e}. Please check the file paths.")
         return None, None, None
 
-    # --- Data Cleaning and Preparation ---
-    grades_df.replace("#DIV/0!", 0, inplace=True)
-
-    if '0' in grades_df.columns:
-        grades_df.drop(columns=['0'], inplace=True)
-
-    assessment_columns = list(set(grades_df.columns) & set(codebook_df['Assessment ID']))
-
-    for col in assessment_columns:
-        grades_df[col] = pd.to_numeric(grades_df[col], errors='coerce')
-
-    grades_df[assessment_columns] = grades_df[assessment_columns].fillna(0)
+    return analysis.failing_students, analysis.competency_performance, analysis.class_recommendations
 
-    passing_threshold = 60
-    failing_students_data = []
+@st.cache_data(show_spinner=False)
+def flatten_failing_students(failing_students_data):
+    # Flatten the data for display in a DataFrame, one row per failed assessment
+    failing_df = pd.json_normalize(failing_students_data, record_path="failed_assessments", meta="student_name")
+    failing_df = failing_df.rename(columns={
+        "student_name": "Student Name",
+        "assessment_id": "Failed Assessment",
+        "score": "Score",
+        "learning_competency": "Learning Competency"
+    })
 
-    for index, student in grades_df.iterrows():
-        student_name = student["Name"]
-        failed_assessments = []
-
-        for assessment_id in assessment_columns:
-            score = student[assessment_id]
-            if score < passing_threshold:
-                assessment_info = codebook_df[codebook_df["Assessment ID"] == assessment_id]
-                if not assessment_info.empty:
-                    failed_assessments.append({
-                        "assessment_id": assessment_id,
-                        "score": round(score, 2),
-                        "content_domain": assessment_info.iloc[0]["Content Domain"],
-                        "learning_competency": assessment_info.iloc[0]["Learning Competency"]
-                    })
-
-        if failed_assessments:
-            failing_students_data.append({
-                "student_name": student_name,
-                "failed_assessments": failed_assessments
-            })
-
-    # --- Dynamic Recommendations Analysis ---
-    competency_performance = {}
-    codebook_df['Learning Competency'] = codebook_df['Learning Competency'].fillna('Unknown')
-    unique_competencies = codebook_df["Learning Competency"].unique()
-
-    for competency in unique_competencies:
-        if competency in [0, 'Unknown'] or pd.isna(competency):
-            continue
-        
-        assessment_ids = codebook_df[codebook_df["Learning Competency"] == competency]["Assessment ID"].tolist()
-        assessment_ids = [aid for aid in assessment_ids if aid in grades_df.columns]
-
-        if not assessment_ids:
-            continue
-
-        total_students = len(grades_df)
-        total_passed = grades_df[assessment_ids].apply(lambda x: (x >= passing_threshold)).sum().sum()
-        total_possible = total_students * len(assessment_ids)
-
-        if total_possible > 0:
-            pass_rate = (total_passed / total_possible) * 100
-            competency_performance[competency] = round(pass_rate, 2)
-
-    sorted_competencies = sorted(competency_performance.items(), key=lambda item: item[1])
-
-    class_recommendations = []
-    for i, (competency, pass_rate) in enumerate(sorted_competencies):
-        if i < 3: # Focus on the 3 most challenging competencies
-            if pass_rate < 50:
-                class_recommendations.append(f"URGENT FOCUS: '{competency}' has a very low pass rate of {pass_rate:.2f}%. A comprehensive re-teaching of this topic is strongly recommended for the entire class.")
-            elif pass_rate < 75:
-                class_recommendations.append(f"HIGH PRIORITY: '{competency}' shows a significant struggle with a {pass_rate:.2f}% pass rate. Consider a targeted review session and providing supplementary materials.")
-            else:
-                class_recommendations.append(f"REVIEW SUGGESTED: While the pass rate for '{competency}' is {pass_rate:.2f}%, a number of students still require support. A quick review or a peer-tutoring session could be beneficial.")
-
-    return failing_students_data, competency_performance, class_recommendations
+    return failing_df[["Student Name", "Failed Assessment", "Score", "Learning Competency"]]
 
 
 st.set_page_config(layout="wide")
@@ -116,18 +59,7 @@ if failing_students_data is not None:
     # --- Students Needing Remediation ---
     st.header("Students Needing Remediation")
     if failing_students_data:
-        # Flatten the data for display in a DataFrame
-        flat_data = []
-        for student in failing_students_data:
-            for assessment in student['failed_assessments']:
-                flat_data.append({
-                    "Student Name": student['student_name'],
-                    "Failed Assessment": assessment['assessment_id'],
-                    "Score": assessment['score'],
-                    "Learning Competency": assessment['learning_competency']
-                })
-        
-        failing_df = pd.DataFrame(flat_data)
+        failing_df = flatten_failing_students(failing_students_data)
 
         # Add filters
         st.subheader("Filter Students")